@@ -12,6 +12,9 @@ Comprehensive analytics dashboard for EdTech/SaaS growth tracking with:
 
 Requirements:
     pip install pandas plotly openpyxl
+    pip install python-calamine  # optional, faster Excel parsing
+    pip install orjson           # optional, faster chart serialization
+    pip install pyarrow          # optional, caches parsed sheets as Parquet between runs
 
 Usage:
     python nova_signals_dashboard.py
@@ -23,10 +26,41 @@ Output:
 Created by: Aryan Agarwal
 """
 
+import hashlib
+import os
+
+import numpy as np
 import pandas as pd
+from pandas.io.parsers import TextParser
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.offline import get_plotlyjs_version
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
+from html import escape
+from itertools import starmap
+from openpyxl import load_workbook
+
+# python-calamine (Rust) parses XLSX much faster than openpyxl; optional
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
+
+# orjson serializes figure data (numpy arrays included) in C; optional
+try:
+    import orjson  # noqa: F401
+    pio.json.config.default_engine = 'orjson'
+except ImportError:
+    pass
+
+# pyarrow backs the Parquet cache of parsed sheets; optional (without it every run parses Excel)
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_CACHE = True
+except ImportError:
+    PARQUET_CACHE = False
 
 # ============================================================================
 # CONFIGURATION
@@ -39,42 +73,227 @@ OUTPUT_REPORT = 'dashboard_report.txt'
 # Sheet name for premium campaign leads
 PREMIUM_CAMPAIGN_SHEET = 'Premium Campaign'
 
+# Sheets loaded by load_all_data, in return order
+SHEETS = ['COC', 'All time class enrllments', 'payments(Monthly)', 'PODCAST LEADS', PREMIUM_CAMPAIGN_SHEET]
+
+# Columns read from each sheet; everything else is skipped at parse time
+# (optional columns such as COC 'Phone' may be absent)
+SHEET_COLUMNS = {
+    'COC': {'DATE', 'Alloted to', 'Phone', 'Total Sales', 'Revenue', 'peakAttendance', 'pitchAttendance'},
+    'All time class enrllments': {'PaymentDate', 'Phone', 'Amount'},
+    'payments(Monthly)': {'Date', 'Amount', 'Current subscription status'},
+    'PODCAST LEADS': {'subscription_date', 'subscription_status'},
+    PREMIUM_CAMPAIGN_SHEET: {'Phone', 'phone'},
+}
+
+# Date column per sheet, and whether a monthly Period 'Month' key is derived from it
+DATE_COLUMNS = {
+    'COC': ('DATE', True),
+    'All time class enrllments': ('PaymentDate', True),
+    'payments(Monthly)': ('Date', True),
+    'PODCAST LEADS': ('subscription_date', False),
+}
+
+# dtypes applied while parsing; repeated groupby/filter keys are read straight
+# into category so they compare as integer codes
+SHEET_DTYPES = {
+    'COC': {'Alloted to': 'category'},
+    'All time class enrllments': {},
+    'payments(Monthly)': {'Current subscription status': 'category'},
+    'PODCAST LEADS': {'subscription_status': 'category'},
+    PREMIUM_CAMPAIGN_SHEET: {},
+}
+
+# Integer amount/count columns narrowed at load to cut memory traffic in reductions
+# (sums still accumulate in int64; columns with fractions are left as float64)
+DOWNCAST_COLUMNS = {
+    'COC': ['Total Sales', 'Revenue', 'peakAttendance', 'pitchAttendance'],
+    'All time class enrllments': ['Amount'],
+    'payments(Monthly)': ['Amount'],
+    'PODCAST LEADS': [],
+}
+
+# Sheets stored pre-sorted by their main groupby key (groupbys then run with sort=False)
+SORT_KEYS = {
+    'COC': 'Alloted to',
+    'payments(Monthly)': 'Month',
+}
+
+# Monthly trend chart switches to quarterly bars beyond this many months
+TREND_MAX_MONTHS = 24
+
+# Parsed sheets are cached here as Parquet, keyed by the Excel file's mtime + size
+CACHE_DIR = '.cache'
+CACHE_VERSION = 13  # bump whenever _prepare_sheet changes the cached columns
+
 # ============================================================================
 # 1. DATA LOADING
 # ============================================================================
 
+def _calamine_frame(xl, sheet_name):
+    """Parse one sheet from an open calamine ExcelFile, keeping SHEET_COLUMNS"""
+    return xl.parse(sheet_name, usecols=SHEET_COLUMNS[sheet_name].__contains__, dtype=SHEET_DTYPES[sheet_name])
+
+def _openpyxl_frame(book, sheet_name):
+    """Build a DataFrame from a read-only openpyxl worksheet (first row = headers), keeping SHEET_COLUMNS"""
+    usecols = SHEET_COLUMNS[sheet_name]
+    rows = book[sheet_name].iter_rows(values_only=True)
+    headers = next(rows, ())
+    if not headers:
+        return pd.DataFrame()
+    keep = [i for i, name in enumerate(headers) if name in usecols]
+    
+    # Skip rows blank across every column (not just the kept ones), matching pd.read_excel
+    data = [tuple(row[i] for i in keep) for row in rows
+            if any(value is not None for value in row)]
+    
+    # TextParser is the parser read_excel itself uses, so column types (and dtypes, also
+    # on header-only sheets) come out exactly as with the calamine engine
+    return TextParser([[headers[i] for i in keep], *data], header=0, dtype=SHEET_DTYPES[sheet_name]).read()
+
+def _cache_key():
+    """Fingerprint the Excel file by mtime + size for the Parquet cache"""
+    stamp = f"{CACHE_VERSION}:{os.path.getmtime(EXCEL_FILE)}:{os.path.getsize(EXCEL_FILE)}"
+    return hashlib.blake2b(stamp.encode()).hexdigest()[:16]
+
+def _cache_path(key, sheet_name):
+    return os.path.join(CACHE_DIR, f"{key}_{sheet_name}.parquet")
+
+def _phone_key(series):
+    """int64 phone keys for hash joins (Excel stores phones as numbers or formatted text);
+    missing or out-of-range phones become -1"""
+    keys = pd.to_numeric(series, errors='coerce')
+
+    # Only formatted text ("+91 98765-43210") fails to parse; reduce just those cells to digits
+    unparsed = keys.isna() & series.notna()
+    if unparsed.any():
+        digits = series[unparsed].astype('string').str.replace(r'\.0$', '', regex=True).str.replace(r'\D', '', regex=True)
+        keys = keys.astype('float64')
+        keys[unparsed] = pd.to_numeric(digits, errors='coerce').astype('float64')
+
+    if keys.dtype == np.int64:
+        values = keys.to_numpy()
+        return np.where(values >= 0, values, -1)
+    # Casting values beyond int64 (e.g. 20+ digit strings) would wrap to INT64_MIN
+    values = keys.to_numpy(dtype='float64', na_value=np.nan)
+    return np.where((values >= 0) & (values < 2.0 ** 63), values, -1).astype(np.int64)
+
+def _add_phone_columns(df):
+    """Replace the raw Phone column with its int64 join key, once per load"""
+    df['Phone_Key'] = _phone_key(df['Phone'])
+    # Raw values can mix numbers and text, which Parquet cannot store in one column
+    df.drop(columns='Phone', inplace=True)
+
+def _prepare_sheet(sheet_name, df):
+    """Normalize columns and parse dates for a freshly read sheet"""
+    if sheet_name == PREMIUM_CAMPAIGN_SHEET:
+        # Normalize column name
+        if 'phone' in df.columns and 'Phone' not in df.columns:
+            df.rename(columns={'phone': 'Phone'}, inplace=True)
+        _add_phone_columns(df)
+        return df
+    
+    # Only the funnel and enrollment sheets are matched on phone
+    if sheet_name in ('COC', 'All time class enrllments') and 'Phone' in df.columns:
+        _add_phone_columns(df)
+    
+    # Calamine already returns datetimes; coerce anything left over
+    date_col, add_month = DATE_COLUMNS[sheet_name]
+    df[date_col] = pd.to_datetime(df[date_col], errors='coerce', cache=True)
+    if add_month:
+        # Period keeps an int64 ordinal per row instead of a 'YYYY-MM' string
+        df['Month'] = df[date_col].dt.to_period('M')
+    
+    for col in DOWNCAST_COLUMNS[sheet_name]:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    
+    sort_key = SORT_KEYS.get(sheet_name)
+    if sort_key in df.columns:
+        df.sort_values(sort_key, inplace=True, kind='stable')
+    
+    return df
+
+def _read_sheet(to_frame, workbook, sheet_name):
+    """Parse one sheet; a missing or unreadable premium sheet becomes an empty frame"""
+    if sheet_name != PREMIUM_CAMPAIGN_SHEET:
+        return to_frame(workbook, sheet_name)
+    try:
+        return to_frame(workbook, sheet_name)
+    except Exception as e:
+        print(f"⚠️  Warning: Could not load '{PREMIUM_CAMPAIGN_SHEET}': {e}")
+        return pd.DataFrame(columns=['Phone'])
+
+def _read_calamine(sheet_names):
+    """Parse the given sheets from a single calamine workbook handle"""
+    with pd.ExcelFile(EXCEL_FILE, engine='calamine') as xl:
+        return {name: _read_sheet(_calamine_frame, xl, name) for name in sheet_names}
+
+def _read_openpyxl(sheet_names):
+    """Parse the given sheets in one read-only openpyxl pass"""
+    book = load_workbook(EXCEL_FILE, read_only=True, data_only=True)
+    try:
+        return {name: _read_sheet(_openpyxl_frame, book, name) for name in sheet_names}
+    finally:
+        book.close()
+
+def _read_excel_sheets(sheet_names):
+    """Read and prepare the given sheets"""
+    if EXCEL_ENGINE == 'calamine':
+        frames = _read_calamine(sheet_names)
+    else:
+        frames = _read_openpyxl(sheet_names)
+    return {name: _prepare_sheet(name, df) for name, df in frames.items()}
+
+def _write_cache(key, frames):
+    """Store parsed sheets as Parquet; the cache is only an optimization, so failures just warn"""
+    tmp_path = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        for name, df in frames.items():
+            path = _cache_path(key, name)
+            # Write then rename, so a failed write never leaves a partial file to be read back
+            tmp_path = path + '.tmp'
+            df.to_parquet(tmp_path, compression='zstd')
+            os.replace(tmp_path, path)
+        tmp_path = None
+        
+        # Drop files cached for earlier versions of the workbook, which can never be read again
+        for entry in os.scandir(CACHE_DIR):
+            if entry.name.endswith('.parquet') and not entry.name.startswith(f"{key}_"):
+                os.remove(entry.path)
+    except Exception as e:
+        print(f"⚠️  Warning: Could not write data cache: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 def load_all_data():
-    """Load all data sources from Excel file"""
+    """Load all data sources, reusing the Parquet cache when the Excel file is unchanged;
+    also returns the workbook fingerprint the data was loaded under"""
     print("📂 Loading all data sources...")
     
-    # Sales funnel data (COC sheet)
-    df_coc = pd.read_excel(EXCEL_FILE, sheet_name='COC')
-    df_coc['DATE'] = pd.to_datetime(df_coc['DATE'], errors='coerce')
-    df_coc['Month'] = df_coc['DATE'].dt.strftime('%Y-%m')
-    
-    # All time class enrollments (lifetime/2yr plans)
-    df_payments = pd.read_excel(EXCEL_FILE, sheet_name='All time class enrllments')
-    df_payments['PaymentDate'] = pd.to_datetime(df_payments['PaymentDate'])
-    df_payments['Month'] = df_payments['PaymentDate'].dt.strftime('%Y-%m')
-    
-    # Monthly subscription payments
-    df_monthly = pd.read_excel(EXCEL_FILE, sheet_name='payments(Monthly)')
-    df_monthly['Date'] = pd.to_datetime(df_monthly['Date'])
-    df_monthly['Month'] = df_monthly['Date'].dt.strftime('%Y-%m')
-    
-    # Podcast leads
-    df_podcast = pd.read_excel(EXCEL_FILE, sheet_name='PODCAST LEADS')
-    df_podcast['subscription_date'] = pd.to_datetime(df_podcast['subscription_date'])
+    key = _cache_key()
+    frames = {}
+    missing = []
+    for name in SHEETS:
+        path = _cache_path(key, name)
+        if PARQUET_CACHE and os.path.exists(path):
+            try:
+                frames[name] = pd.read_parquet(path)
+                continue
+            except Exception as e:
+                # A corrupt or unreadable cache file just means re-reading that sheet from Excel
+                print(f"⚠️  Warning: Could not read cached '{name}': {e}")
+        missing.append(name)
+    
+    if missing:
+        frames.update(_read_excel_sheets(missing))
+        if PARQUET_CACHE:
+            _write_cache(key, {name: frames[name] for name in missing})
+    else:
+        print(f"⚡ Using cached data from {CACHE_DIR}/")
     
-    # Premium campaign leads
-    try:
-        df_premium = pd.read_excel(EXCEL_FILE, sheet_name=PREMIUM_CAMPAIGN_SHEET)
-        # Normalize column name
-        if 'phone' in df_premium.columns and 'Phone' not in df_premium.columns:
-            df_premium.rename(columns={'phone': 'Phone'}, inplace=True)
-    except Exception as e:
-        print(f"⚠️  Warning: Could not load '{PREMIUM_CAMPAIGN_SHEET}': {e}")
-        df_premium = pd.DataFrame(columns=['Phone'])
+    df_coc, df_payments, df_monthly, df_podcast, df_premium = (frames[name] for name in SHEETS)
     
     print(f"✅ Loaded Sales Funnel (COC): {df_coc.shape}")
     print(f"✅ Loaded All Time Enrollments: {df_payments.shape}")
@@ -82,7 +301,7 @@ def load_all_data():
     print(f"✅ Loaded Podcast Leads: {df_podcast.shape}")
     print(f"✅ Loaded Premium Campaign Leads: {df_premium.shape}")
     
-    return df_coc, df_payments, df_monthly, df_podcast, df_premium
+    return df_coc, df_payments, df_monthly, df_podcast, df_premium, key
 
 # ============================================================================
 # 2. CALCULATE MONTHLY RECURRING METRICS
@@ -93,31 +312,33 @@ def calculate_monthly_recurring_metrics(df_monthly):
     
     print("\n📊 Calculating monthly recurring payment metrics...")
     
+    # Revenue and row count per status in a single pass
+    by_status = df_monthly.groupby('Current subscription status', sort=False, observed=True)['Amount'].agg(['sum', 'size'])
+    
     # Overall metrics
     total_subscriptions = len(df_monthly)
-    active_subscriptions = int((df_monthly['Current subscription status'] == 'active').sum())
+    active_subscriptions = int(by_status['size'].get('active', 0))
     cancelled_subscriptions = total_subscriptions - active_subscriptions
     
     total_revenue = float(df_monthly['Amount'].sum())
     avg_subscription_value = float(df_monthly['Amount'].mean())
     
-    # Active subscription MRR
-    active_df = df_monthly[df_monthly['Current subscription status'] == 'active']
-    active_mrr = float(active_df['Amount'].sum())
+    # Active subscription MRR and its annual run rate
+    active_mrr = float(by_status['sum'].get('active', 0))
+    active_arr = active_mrr * 12
     
     # Churn metrics
     churn_rate = (cancelled_subscriptions / total_subscriptions * 100) if total_subscriptions > 0 else 0.0
     retention_rate = 100 - churn_rate
     
-    # Month-over-month trends
-    monthly_trends = df_monthly.groupby('Month').agg({
-        'Amount': ['sum', 'count', 'mean']
-    }).reset_index()
-    monthly_trends.columns = ['Month', 'Revenue', 'Count', 'AvgValue']
-    monthly_trends = monthly_trends.sort_values('Month')
+    # Month-over-month trends (mean derived from sum/count, no extra pass)
+    monthly_trends = df_monthly.groupby('Month', sort=False, observed=True)['Amount'].agg(['sum', 'count'])
+    monthly_trends['mean'] = monthly_trends['sum'] / monthly_trends['count']
+    monthly_trends = monthly_trends.rename(columns={'sum': 'Revenue', 'count': 'Count', 'mean': 'AvgValue'}).reset_index()
+    monthly_trends = monthly_trends.sort_values('Month', ignore_index=True)
     
     # Revenue by status
-    revenue_by_status = df_monthly.groupby('Current subscription status')['Amount'].sum().to_dict()
+    revenue_by_status = by_status['sum'].to_dict()
     
     recurring_metrics = {
         'total_subscriptions': total_subscriptions,
@@ -125,6 +346,7 @@ def calculate_monthly_recurring_metrics(df_monthly):
         'cancelled_subscriptions': cancelled_subscriptions,
         'total_revenue': total_revenue,
         'active_mrr': active_mrr,
+        'active_arr': active_arr,
         'avg_subscription_value': avg_subscription_value,
         'churn_rate': churn_rate,
         'retention_rate': retention_rate,
@@ -143,6 +365,17 @@ def calculate_monthly_recurring_metrics(df_monthly):
 # 3. CALCULATE TEAM PERFORMANCE METRICS
 # ============================================================================
 
+def _empty_team_metrics():
+    """Team metrics when no COC rows are assigned to a team member"""
+    return {
+        'team_stats': pd.DataFrame(columns=['Alloted to', 'Total Sales', 'Revenue', 'peakAttendance',
+                                            'pitchAttendance', 'conversion_rate', 'revenue_per_sale']),
+        'top_performer': "N/A",
+        'top_revenue': 0.0,
+        'top_sales': 0,
+        'total_team_members': 0
+    }
+
 def calculate_team_performance(df_coc):
     """Calculate team member performance from 'Alloted to' column"""
     
@@ -150,16 +383,16 @@ def calculate_team_performance(df_coc):
     
     if 'Alloted to' not in df_coc.columns:
         print("⚠️  No 'Alloted to' column found in COC sheet")
-        return {}
+        return _empty_team_metrics()
     
     df_team = df_coc[df_coc['Alloted to'].notna()].copy()
     
-    if len(df_team) == 0:
+    if df_team.empty:
         print("⚠️  No 'Alloted to' data found")
-        return {}
+        return _empty_team_metrics()
     
     # Aggregate by team member
-    team_stats = df_team.groupby('Alloted to').agg({
+    team_stats = df_team.groupby('Alloted to', sort=False, observed=True).agg({
         'Total Sales': 'sum',
         'Revenue': 'sum',
         'peakAttendance': 'sum',
@@ -173,15 +406,10 @@ def calculate_team_performance(df_coc):
     # Sort by revenue
     team_stats = team_stats.sort_values('Revenue', ascending=False)
     
-    # Top performer
-    if len(team_stats) > 0:
-        top_performer = team_stats.iloc[0]['Alloted to']
-        top_revenue = float(team_stats.iloc[0]['Revenue'])
-        top_sales = int(team_stats.iloc[0]['Total Sales'])
-    else:
-        top_performer = "N/A"
-        top_revenue = 0.0
-        top_sales = 0
+    # Top performer (df_team is non-empty, so there is at least one row)
+    top_performer = team_stats.iloc[0]['Alloted to']
+    top_revenue = float(team_stats.iloc[0]['Revenue'])
+    top_sales = int(team_stats.iloc[0]['Total Sales'])
     
     team_metrics = {
         'team_stats': team_stats,
@@ -201,30 +429,33 @@ def calculate_team_performance(df_coc):
 # 4. CALCULATE TEAM ENROLLMENT ATTRIBUTION
 # ============================================================================
 
+# Columns of the per-member attribution table (also used for the empty table)
+ENROLLMENT_STATS_COLUMNS = ['Team_Member', 'Enrollment_Count', 'Total_Revenue', 'Avg_Revenue']
+
 def calculate_team_enrollment_attribution(df_coc, df_payments):
     """Map enrollments to team members via phone number matching"""
     
     print("\n📊 Calculating team enrollment attribution...")
     
-    if 'Alloted to' not in df_coc.columns or 'Phone' not in df_coc.columns:
+    if 'Alloted to' not in df_coc.columns or 'Phone_Key' not in df_coc.columns:
         print("⚠️  Missing required columns for attribution")
         return {
-            'team_enrollment_stats': None,
+            'team_enrollment_stats': pd.DataFrame(columns=ENROLLMENT_STATS_COLUMNS),
             'total_mapped_enrollments': 0,
             'total_unmapped_enrollments': len(df_payments),
             'mapping_coverage': 0.0
         }
     
-    # Clean phone numbers
-    df_coc['Phone_Clean'] = df_coc['Phone'].astype(str).str.replace('.0', '', regex=False).str.strip()
-    df_payments['Phone_Clean'] = df_payments['Phone'].astype(str).str.replace('.0', '', regex=False).str.strip()
-    
-    # Create phone to team member mapping from COC
-    phone_to_team = df_coc[df_coc['Alloted to'].notna()].drop_duplicates('Phone_Clean')[['Phone_Clean', 'Alloted to']]
-    phone_to_team_dict = dict(zip(phone_to_team['Phone_Clean'], phone_to_team['Alloted to']))
+    # Create phone to team member mapping from COC (first assignment in sheet order wins;
+    # COC is stored sorted by team, so restore the original row order first)
+    has_team = df_coc['Alloted to'].notna() & (df_coc['Phone_Key'] >= 0)
+    phone_to_team = (df_coc.loc[has_team, ['Phone_Key', 'Alloted to']]
+                     .sort_index()
+                     .groupby('Phone_Key', sort=False, observed=True)['Alloted to']
+                     .first())
     
-    # Map enrollments to team members
-    df_payments['Team_Member'] = df_payments['Phone_Clean'].map(phone_to_team_dict)
+    # Map enrollments to team members (one hash table, keyed by int64 phone)
+    df_payments = df_payments.assign(Team_Member=df_payments['Phone_Key'].map(phone_to_team))
     
     # Calculate attribution metrics
     mapped_enrollments = df_payments[df_payments['Team_Member'].notna()]
@@ -234,17 +465,25 @@ def calculate_team_enrollment_attribution(df_coc, df_payments):
     total_unmapped = len(unmapped_enrollments)
     mapping_coverage = (total_mapped / len(df_payments) * 100) if len(df_payments) > 0 else 0.0
     
-    # Team-level aggregation
+    # Team-level aggregation: integer team codes + bincount reduce each column in one C pass
+    # (mapped rows always have a phone, so the enrollment count is the row count)
     if total_mapped > 0:
-        team_enrollment_stats = mapped_enrollments.groupby('Team_Member').agg({
-            'Phone': 'count',
-            'Amount': ['sum', 'mean']
-        }).reset_index()
+        codes, members = pd.factorize(mapped_enrollments['Team_Member'])
+        amount_col = mapped_enrollments['Amount']
+        amount = amount_col.to_numpy(dtype=np.float64, na_value=np.nan)
+        has_amount = ~np.isnan(amount)
+        
+        counts = np.bincount(codes, minlength=len(members))
+        revenue = np.bincount(codes, weights=np.where(has_amount, amount, 0.0), minlength=len(members))
+        if pd.api.types.is_integer_dtype(amount_col):
+            revenue = revenue.astype(np.int64)  # bincount sums in float64; whole-rupee totals are exact
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_revenue = revenue / np.bincount(codes, weights=has_amount, minlength=len(members))
         
-        team_enrollment_stats.columns = ['Team_Member', 'Enrollment_Count', 'Total_Revenue', 'Avg_Revenue']
-        team_enrollment_stats = team_enrollment_stats.sort_values('Total_Revenue', ascending=False)
+        team_enrollment_stats = pd.DataFrame(dict(zip(ENROLLMENT_STATS_COLUMNS, (members, counts, revenue, avg_revenue))))
+        team_enrollment_stats = team_enrollment_stats.sort_values(['Total_Revenue', 'Team_Member'], ascending=[False, True])
     else:
-        team_enrollment_stats = None
+        team_enrollment_stats = pd.DataFrame(columns=ENROLLMENT_STATS_COLUMNS)
     
     attribution_metrics = {
         'team_enrollment_stats': team_enrollment_stats,
@@ -273,15 +512,22 @@ def calculate_activity_metrics(df_payments):
     # Use PaymentDate as last activity indicator
     df_payments['days_since_payment'] = (today - df_payments['PaymentDate']).dt.days
     
+    # Sort once (missing dates dropped), then count every threshold by binary search
+    days = df_payments['days_since_payment'].to_numpy(dtype=float)
+    days = np.sort(days[~np.isnan(days)])
+    within_7d, within_14d, within_30d, within_90d = (
+        int(n) for n in np.searchsorted(days, [7, 14, 30, 90], side='right')
+    )
+    
     # Activity segmentation
-    active_7d = int((df_payments['days_since_payment'] <= 7).sum())
-    active_30d = int((df_payments['days_since_payment'] <= 30).sum())
-    active_90d = int((df_payments['days_since_payment'] <= 90).sum())
-    dormant = int((df_payments['days_since_payment'] > 90).sum())
+    active_7d = within_7d
+    active_30d = within_30d
+    active_90d = within_90d
+    dormant = len(days) - within_90d
     
     # Churn risk
-    churn_risk_14d = int((df_payments['days_since_payment'] > 14).sum())
-    churn_risk_30d = int((df_payments['days_since_payment'] > 30).sum())
+    churn_risk_14d = len(days) - within_14d
+    churn_risk_30d = len(days) - within_30d
     
     # Average days since last payment
     avg_days_inactive = float(df_payments['days_since_payment'].mean())
@@ -341,32 +587,28 @@ def calculate_user_segments(df_coc, df_payments, df_monthly, df_podcast, df_prem
     podcast_cancelled = int((df_podcast['subscription_status'] == 'cancelled').sum())
     podcast_mrr = podcast_active * 999
     
-    # 4. PREMIUM CAMPAIGN - Cross-match with payments
-    df_premium['Phone_Clean'] = df_premium['Phone'].astype(str).str.replace('.0', '', regex=False).str.strip()
-    df_payments['Phone_Clean'] = df_payments['Phone'].astype(str).str.replace('.0', '', regex=False).str.strip()
-    
-    premium_phones = set(df_premium['Phone_Clean'])
-    payment_phones = set(df_payments['Phone_Clean'])
+    # 4. PREMIUM CAMPAIGN - Cross-match with payments on int64 phone keys (-1 = missing)
+    payment_keys = df_payments['Phone_Key'].to_numpy()
+    premium_keys = df_premium['Phone_Key'].to_numpy()
     
     # Customers who converted from premium campaign
-    premium_customer_phones = premium_phones.intersection(payment_phones)
-    
-    # Pure leads who haven't converted yet
-    premium_pure_lead_phones = premium_phones - payment_phones
+    in_premium = pd.Index(payment_keys).isin(premium_keys) & (payment_keys >= 0)
+    premium_customers_df = df_payments[in_premium]
     
-    # Filter payment data for premium customers
-    premium_customers_df = df_payments[df_payments['Phone_Clean'].isin(premium_customer_phones)]
+    # Pure leads who haven't converted yet; blank phones (key -1) are not leads, so
+    # they no longer add a single 'nan' lead to Pure Leads and TAM
+    is_pure_lead = ~pd.Index(premium_keys).isin(payment_keys) & (premium_keys >= 0)
     
-    # Calculate metrics
-    premium_customer_count = len(premium_customer_phones)
-    premium_pure_lead_count = len(premium_pure_lead_phones)
+    # Calculate metrics (unique phones, not payment rows)
+    premium_customer_count = len(pd.unique(payment_keys[in_premium]))
+    premium_pure_lead_count = len(pd.unique(premium_keys[is_pure_lead]))
     premium_customer_revenue = float(premium_customers_df['Amount'].sum())
     premium_avg_revenue = float(premium_customers_df['Amount'].mean()) if premium_customer_count > 0 else 0.0
     premium_pct_all_time = (premium_customer_count / all_time_count * 100) if all_time_count > 0 else 0.0
     
     # Lead-level metrics
     premium_total_leads = len(df_premium)
-    premium_unique_phones = df_premium['Phone_Clean'].nunique()
+    premium_unique_phones = len(pd.unique(premium_keys[premium_keys >= 0]))
     premium_quality = (premium_unique_phones / premium_total_leads * 100) if premium_total_leads > 0 else 0.0
     premium_conversion_rate = (premium_customer_count / premium_total_leads * 100) if premium_total_leads > 0 else 0.0
     
@@ -481,6 +723,10 @@ def calculate_user_segments(df_coc, df_payments, df_monthly, df_podcast, df_prem
 def create_funnel_chart(metrics):
     """Create sales funnel visualization"""
     
+    # Funnel starts at peak attendance; without it there is nothing to draw
+    if not metrics['funnel']['peak']:
+        return "<p>No funnel data available</p>"
+    
     stages = ['Peak Attendance', 'Pitch Attendance', 'Total Sales']
     values = [
         metrics['funnel']['peak'],
@@ -502,18 +748,32 @@ def create_funnel_chart(metrics):
         margin=dict(l=20, r=20, t=60, b=20)
     )
     
-    return fig.to_html(include_plotlyjs='cdn', div_id='funnel_chart')
+    return fig.to_html(full_html=False, include_plotlyjs=False, div_id='funnel_chart')
 
 def create_monthly_trend_chart(recurring_metrics):
     """Create monthly revenue trend chart"""
     
     df_trends = recurring_metrics['monthly_trends']
     
+    if df_trends.empty:
+        return "<p>No monthly recurring data available</p>"
+    
+    # Long histories are rolled up to quarters so the chart stays readable
+    period_label = "Month"
+    if len(df_trends) > TREND_MAX_MONTHS:
+        period_label = "Quarter"
+        df_trends = (df_trends.groupby(df_trends['Month'].dt.asfreq('Q'), sort=False)[['Revenue', 'Count']]
+                     .sum()
+                     .rename_axis('Month')
+                     .reset_index())
+    
     fig = go.Figure()
     
     # Revenue line
+    months = df_trends['Month'].astype(str)
+    
     fig.add_trace(go.Scatter(
-        x=df_trends['Month'],
+        x=months,
         y=df_trends['Revenue'],
         mode='lines+markers',
         name='Revenue',
@@ -523,7 +783,7 @@ def create_monthly_trend_chart(recurring_metrics):
     
     # Subscription count (secondary axis)
     fig.add_trace(go.Bar(
-        x=df_trends['Month'],
+        x=months,
         y=df_trends['Count'],
         name='Subscription Count',
         marker_color='#764ba2',
@@ -533,7 +793,7 @@ def create_monthly_trend_chart(recurring_metrics):
     
     fig.update_layout(
         title="Monthly Recurring Revenue Trend",
-        xaxis_title="Month",
+        xaxis_title=period_label,
         yaxis_title="Revenue (₹)",
         yaxis2=dict(
             title="Subscription Count",
@@ -545,19 +805,23 @@ def create_monthly_trend_chart(recurring_metrics):
         margin=dict(l=20, r=60, t=60, b=60)
     )
     
-    return fig.to_html(include_plotlyjs=False, div_id='monthly_trend_chart')
+    return fig.to_html(full_html=False, include_plotlyjs=False, div_id='monthly_trend_chart')
 
 def create_team_performance_chart(team_metrics):
     """Create team performance comparison chart"""
     
-    team_data = team_metrics.get('team_stats')
+    team_data = team_metrics['team_stats']
     
-    if team_data is None or len(team_data) == 0:
+    if team_data.empty:
         return "<p>No team performance data available</p>"
     
     # Top 10 performers
     top_team = team_data.head(10)
     
+    # Bar labels built column-wise rather than with a per-row lambda
+    rev_labels = '₹' + (top_team['Revenue'] / 1000).round().astype('int64').astype(str) + 'K'
+    conv_labels = top_team['conversion_rate'].map('{:.1f}%'.format)
+    
     fig = make_subplots(
         rows=1, cols=2,
         subplot_titles=('Revenue by Team Member', 'Conversion Rate by Team Member'),
@@ -571,7 +835,7 @@ def create_team_performance_chart(team_metrics):
             y=top_team['Revenue'],
             name='Revenue',
             marker_color='#667eea',
-            text=top_team['Revenue'].apply(lambda x: f'₹{x/1000:.0f}K'),
+            text=rev_labels,
             textposition='outside'
         ),
         row=1, col=1
@@ -584,7 +848,7 @@ def create_team_performance_chart(team_metrics):
             y=top_team['conversion_rate'],
             name='Conversion Rate',
             marker_color='#764ba2',
-            text=top_team['conversion_rate'].apply(lambda x: f'{x:.1f}%'),
+            text=conv_labels,
             textposition='outside'
         ),
         row=1, col=2
@@ -597,85 +861,113 @@ def create_team_performance_chart(team_metrics):
         margin=dict(l=20, r=20, t=80, b=120)
     )
     
-    return fig.to_html(include_plotlyjs=False, div_id='team_performance_chart')
+    return fig.to_html(full_html=False, include_plotlyjs=False, div_id='team_performance_chart')
 
 # ============================================================================
 # 8. CREATE HTML DASHBOARD
 # ============================================================================
 
-def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_metrics):
-    """Create comprehensive HTML dashboard with charts"""
-    
-    team_data = team_metrics.get('team_stats')
-    if team_data is not None and len(team_data) > 0:
-        team_names = team_data['Alloted to'].tolist()
-        team_revenue = team_data['Revenue'].tolist()
-        team_sales = team_data['Total Sales'].tolist()
-        team_conversion = team_data['conversion_rate'].tolist()
-    else:
-        team_names, team_revenue, team_sales, team_conversion = [], [], [], []
-    
-    team_enroll_data = metrics['team_enrollments'].get('team_enrollment_stats')
-    if team_enroll_data is not None and len(team_enroll_data) > 0:
-        team_enroll_members = team_enroll_data['Team_Member'].tolist()
-        team_enroll_revenue = team_enroll_data['Total_Revenue'].tolist()
-        team_enroll_count = team_enroll_data['Enrollment_Count'].tolist()
-        team_enroll_avg = team_enroll_data['Avg_Revenue'].tolist()
-    else:
-        team_enroll_members, team_enroll_revenue, team_enroll_count, team_enroll_avg = [], [], [], []
-    
-    # TAM breakdown
-    tam_paying = metrics['combined']['paying_users']
-    tam_leads = metrics['premium_campaign']['pure_leads']
-    tam_total = metrics['revenue_metrics']['total_addressable_market']
-    
-    # Premium campaign unique market
-    premium_customers = metrics['premium_campaign']['customers']
-    premium_pure_leads = metrics['premium_campaign']['pure_leads']
-    premium_unique_market = metrics['premium_campaign']['unique_market']
-    
-    # Recent activity
-    recent_date_str = "N/A"
-    if pd.notna(metrics['premium_campaign']['recent_date']):
-        recent_date_str = metrics['premium_campaign']['recent_date'].strftime('%Y-%m-%d')
-    
-    # Generate charts
-    funnel_chart_html = create_funnel_chart(metrics)
-    monthly_trend_html = create_monthly_trend_chart(recurring_metrics)
-    team_chart_html = create_team_performance_chart(team_metrics)
-    
-    html_content = f"""<!DOCTYPE html>
+# Prefix for each metrics group in the flat render context
+_METRIC_PREFIXES = {
+    'all_time': 'all_time_',
+    'monthly': 'monthly_',
+    'podcast': 'podcast_',
+    'premium_campaign': 'pc_',
+    'funnel': 'funnel_',
+    'combined': 'combined_',
+    'revenue_metrics': 'rev_',
+    'team_enrollments': 'te_',
+}
+
+def _date_str(ts):
+    """Format a Timestamp as YYYY-MM-DD, or 'N/A' for NaT (ts == ts is False only for NaT/NaN)"""
+    return ts.strftime('%Y-%m-%d') if ts is not pd.NaT and ts == ts else 'N/A'
+
+def _flatten_metrics(metrics, activity_metrics, team_metrics, recurring_metrics):
+    """Flatten all metric dicts into one prefixed lookup for the renderers"""
+    ctx = {
+        'act_active_30d': 0,
+        'act_engagement_rate': 0,
+        'act_dormant': 0,
+        'act_churn_risk_30d': 0,
+        'act_avg_days_inactive': 0,
+        'act_most_recent_date': pd.NaT,
+        # One timestamp for the header, footer and report
+        'generated_at': datetime.now().strftime('%B %d, %Y at %I:%M %p IST'),
+    }
+    for group, prefix in _METRIC_PREFIXES.items():
+        for key, value in metrics[group].items():
+            ctx[prefix + key] = value
+    for prefix, group in (('mrr_', recurring_metrics), ('act_', activity_metrics), ('team_', team_metrics)):
+        for key, value in group.items():
+            ctx[prefix + key] = value
+    
+    # Scaled and formatted values, computed once for every template that shows them
+    ctx.update({
+        'funnel_revenue_k': ctx['funnel_revenue'] / 1000,
+        'mrr_active_mrr_k': ctx['mrr_active_mrr'] / 1000,
+        'mrr_arr_k': ctx['mrr_active_arr'] / 1000,
+        'pc_revenue_k': ctx['pc_revenue'] / 1000,
+        'pc_potential_k': ctx['pc_pure_leads'] * ctx['pc_avg_revenue'] / 1000,
+        'pc_recent_date_str': _date_str(ctx['pc_recent_date']),
+        'act_most_recent_date_str': _date_str(ctx['act_most_recent_date']),
+        'combined_revenue_m': ctx['combined_revenue'] / 1000000,
+        'all_time_revenue_m': ctx['all_time_revenue'] / 1000000,
+        'monthly_revenue_m': ctx['monthly_revenue'] / 1000000,
+        'rev_arr_m': ctx['rev_arr'] / 1000000,
+    })
+    return ctx
+
+# plotly.js is loaded once in the page head (charts are emitted with include_plotlyjs=False);
+# the CDN build matches the installed plotly so figure JSON and renderer agree
+PLOTLYJS_CDN_URL = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
+# Static page chrome around the stylesheet and the rendered sections
+_HEAD = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>NovaSignals Growth Dashboard</title>
-    <script src="https://cdn.plot.ly/plotly-2.27.0.min.js"></script>
+    <script src="{PLOTLYJS_CDN_URL}"></script>
     <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{
+"""
+
+_BODY_OPEN = """    </style>
+</head>
+<body>
+    <div class="container">
+"""
+
+_PAGE_CLOSE = """    </div>
+</body>
+</html>"""
+
+# Static stylesheet, kept as a plain string so it is not re-formatted on every render
+_CSS = """        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             padding: 20px;
             color: #333;
-        }}
-        .container {{
+        }
+        .container {
             max-width: 1800px;
             margin: 0 auto;
             background: white;
             border-radius: 15px;
             box-shadow: 0 10px 40px rgba(0,0,0,0.2);
             padding: 40px;
-        }}
-        header {{
+        }
+        header {
             text-align: center;
             margin-bottom: 40px;
             padding-bottom: 20px;
             border-bottom: 3px solid #667eea;
-        }}
-        h1 {{ font-size: 3em; color: #667eea; margin-bottom: 10px; }}
-        .subtitle {{ font-size: 1.3em; color: #764ba2; font-weight: 600; }}
-        .section-header {{
+        }
+        h1 { font-size: 3em; color: #667eea; margin-bottom: 10px; }
+        .subtitle { font-size: 1.3em; color: #764ba2; font-weight: 600; }
+        .section-header {
             font-size: 1.8em;
             color: #667eea;
             margin: 40px 0 20px 0;
@@ -684,22 +976,22 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
             display: flex;
             align-items: center;
             gap: 10px;
-        }}
-        .grid-3 {{
+        }
+        .grid-3 {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(350px, 1fr));
             gap: 25px;
             margin-bottom: 40px;
-        }}
-        .metric-card {{
+        }
+        .metric-card {
             background: linear-gradient(135deg, #f8f9fa 0%, #ffffff 100%);
             border-radius: 12px;
             padding: 25px;
             border: 2px solid #e0e0e0;
             transition: transform 0.3s, box-shadow 0.3s;
-        }}
-        .metric-card:hover {{ transform: translateY(-5px); box-shadow: 0 8px 20px rgba(0,0,0,0.1); }}
-        .metric-header {{
+        }
+        .metric-card:hover { transform: translateY(-5px); box-shadow: 0 8px 20px rgba(0,0,0,0.1); }
+        .metric-header {
             display: flex;
             align-items: center;
             gap: 10px;
@@ -709,61 +1001,61 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
             margin-bottom: 20px;
             padding-bottom: 15px;
             border-bottom: 2px solid #667eea;
-        }}
-        .metric-icon {{ font-size: 1.5em; }}
-        .metric-value {{
+        }
+        .metric-icon { font-size: 1.5em; }
+        .metric-value {
             font-size: 2.5em;
             font-weight: 700;
             color: #667eea;
             margin: 15px 0;
-        }}
-        .metric-label {{
+        }
+        .metric-label {
             font-size: 1em;
             color: #666;
             margin-bottom: 5px;
-        }}
-        .metric-subvalue {{
+        }
+        .metric-subvalue {
             font-size: 1.2em;
             color: #888;
             margin-top: 10px;
-        }}
-        .tam-box {{
+        }
+        .tam-box {
             background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
             color: white;
             padding: 30px;
             border-radius: 12px;
             margin-bottom: 40px;
-        }}
-        .tam-box h3 {{ font-size: 1.5em; margin-bottom: 20px; }}
-        .tam-grid {{
+        }
+        .tam-box h3 { font-size: 1.5em; margin-bottom: 20px; }
+        .tam-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
             gap: 20px;
             margin-top: 20px;
-        }}
-        .tam-item {{
+        }
+        .tam-item {
             background: rgba(255, 255, 255, 0.2);
             padding: 20px;
             border-radius: 10px;
             backdrop-filter: blur(10px);
-        }}
-        .tam-item h4 {{
+        }
+        .tam-item h4 {
             font-size: 0.9em;
             opacity: 0.9;
             margin-bottom: 10px;
             text-transform: uppercase;
             letter-spacing: 1px;
-        }}
-        .tam-item .value {{ font-size: 2em; font-weight: bold; }}
-        .tam-item .insight {{ font-size: 0.85em; margin-top: 8px; opacity: 0.9; }}
-        .chart-container {{
+        }
+        .tam-item .value { font-size: 2em; font-weight: bold; }
+        .tam-item .insight { font-size: 0.85em; margin-top: 8px; opacity: 0.9; }
+        .chart-container {
             background: white;
             border-radius: 12px;
             padding: 20px;
             margin: 30px 0;
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        .team-table {{
+        }
+        .team-table {
             width: 100%;
             border-collapse: collapse;
             margin: 20px 0;
@@ -771,36 +1063,36 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
             border-radius: 8px;
             overflow: hidden;
             box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        }}
-        .team-table th {{
+        }
+        .team-table th {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 15px;
             text-align: left;
             font-weight: 600;
-        }}
-        .team-table td {{
+        }
+        .team-table td {
             padding: 12px 15px;
             border-bottom: 1px solid #e0e0e0;
-        }}
-        .team-table tr:last-child td {{ border-bottom: none; }}
-        .team-table tr:hover {{ background: #f8f9fa; }}
-        .highlight-box {{
+        }
+        .team-table tr:last-child td { border-bottom: none; }
+        .team-table tr:hover { background: #f8f9fa; }
+        .highlight-box {
             background: linear-gradient(135deg, #fff3cd 0%, #fffaed 100%);
             border-left: 4px solid #ffc107;
             padding: 20px;
             border-radius: 8px;
             margin: 20px 0;
-        }}
-        .highlight-box h4 {{ color: #856404; margin-bottom: 10px; }}
-        footer {{
+        }
+        .highlight-box h4 { color: #856404; margin-bottom: 10px; }
+        footer {
             text-align: center;
             margin-top: 50px;
             padding-top: 30px;
             border-top: 2px solid #e0e0e0;
             color: #666;
-        }}
-        .creator-badge {{
+        }
+        .creator-badge {
             display: inline-block;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
@@ -809,18 +1101,19 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
             font-size: 0.95em;
             font-weight: 600;
             margin-top: 10px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <header>
+        }
+"""
+
+# Page header with generation timestamp
+_HEADER_TEMPLATE = """        <header>
             <h1>📊 NovaSignals Growth Dashboard</h1>
             <p class="subtitle">Comprehensive Analytics | Team Performance | TAM Tracking</p>
-            <p style="margin-top: 10px; color: #666;">Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p IST')}</p>
+            <p style="margin-top: 10px; color: #666;">Generated: {generated_at}</p>
         </header>
+"""
 
-        <h2 class="section-header">
+# TAM breakdown section
+_TAM_TEMPLATE = """        <h2 class="section-header">
             <span>🎯</span>
             Total Addressable Market (TAM) - CORRECTED
         </h2>
@@ -830,27 +1123,29 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
             <div class="tam-grid">
                 <div class="tam-item">
                     <h4>Current Paying Users</h4>
-                    <div class="value">{tam_paying:,}</div>
+                    <div class="value">{combined_paying_users:,}</div>
                     <div class="insight">All time + Monthly + Podcast</div>
                 </div>
                 <div class="tam-item">
                     <h4>+ Pure Leads (Not Converted)</h4>
-                    <div class="value">{tam_leads:,}</div>
+                    <div class="value">{pc_pure_leads:,}</div>
                     <div class="insight">Premium campaign unconverted</div>
                 </div>
                 <div class="tam-item">
                     <h4>= Total Addressable Market</h4>
-                    <div class="value">{tam_total:,}</div>
+                    <div class="value">{rev_total_addressable_market:,}</div>
                     <div class="insight">Unique addressable users</div>
                 </div>
             </div>
             <div style="background: rgba(0,0,0,0.1); padding: 15px; border-left: 4px solid #fff; margin-top: 20px; font-size: 0.9em;">
-                <strong>✅ Correction Applied:</strong> Premium campaign customers ({premium_customers:,}) are a SUBSET of all-time enrollments ({metrics['all_time']['count']:,}). 
-                They're not double-counted in TAM. Only the {tam_leads:,} unconverted leads are added.
+                <strong>✅ Correction Applied:</strong> Premium campaign customers ({pc_customers:,}) are a SUBSET of all-time enrollments ({all_time_count:,}). 
+                They're not double-counted in TAM. Only the {pc_pure_leads:,} unconverted leads are added.
             </div>
         </div>
+"""
 
-        <h2 class="section-header">
+# Sales funnel cards and chart
+_FUNNEL_TEMPLATE = """        <h2 class="section-header">
             <span>📈</span>
             Sales Funnel Performance
         </h2>
@@ -861,7 +1156,7 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">👥</span>
                     <span>Peak Attendance</span>
                 </div>
-                <div class="metric-value">{metrics['funnel']['peak']:,}</div>
+                <div class="metric-value">{funnel_peak:,}</div>
                 <div class="metric-label">Total Attendees</div>
                 <div class="metric-subvalue">Funnel Entry Point</div>
             </div>
@@ -871,8 +1166,8 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">🎯</span>
                     <span>Pitch Attendance</span>
                 </div>
-                <div class="metric-value">{metrics['funnel']['pitch']:,}</div>
-                <div class="metric-label">Show-up Rate: {metrics['funnel']['show_up_rate']:.1f}%</div>
+                <div class="metric-value">{funnel_pitch:,}</div>
+                <div class="metric-label">Show-up Rate: {funnel_show_up_rate:.1f}%</div>
                 <div class="metric-subvalue">Engaged Prospects</div>
             </div>
 
@@ -881,17 +1176,19 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">💰</span>
                     <span>Conversion Rate</span>
                 </div>
-                <div class="metric-value">{metrics['funnel']['conversion_rate']:.1f}%</div>
-                <div class="metric-label">Total Sales: {metrics['funnel']['sales']:,}</div>
-                <div class="metric-subvalue">Revenue: ₹{metrics['funnel']['revenue']/1000:.0f}K</div>
+                <div class="metric-value">{funnel_conversion_rate:.1f}%</div>
+                <div class="metric-label">Total Sales: {funnel_sales:,}</div>
+                <div class="metric-subvalue">Revenue: ₹{funnel_revenue_k:.0f}K</div>
             </div>
         </div>
 
         <div class="chart-container">
             {funnel_chart_html}
         </div>
+"""
 
-        <h2 class="section-header">
+# Monthly recurring revenue cards and chart
+_MRR_TEMPLATE = """        <h2 class="section-header">
             <span>💳</span>
             Monthly Recurring Revenue Analysis
         </h2>
@@ -902,9 +1199,9 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">📊</span>
                     <span>Active MRR</span>
                 </div>
-                <div class="metric-value">₹{recurring_metrics['active_mrr']/1000:.1f}K</div>
+                <div class="metric-value">₹{mrr_active_mrr_k:.1f}K</div>
                 <div class="metric-label">Monthly Recurring Revenue</div>
-                <div class="metric-subvalue">ARR: ₹{recurring_metrics['active_mrr']*12/1000:.1f}K</div>
+                <div class="metric-subvalue">ARR: ₹{mrr_arr_k:.1f}K</div>
             </div>
 
             <div class="metric-card">
@@ -912,9 +1209,9 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">✅</span>
                     <span>Active Subscriptions</span>
                 </div>
-                <div class="metric-value">{recurring_metrics['active_subscriptions']:,}</div>
-                <div class="metric-label">Out of {recurring_metrics['total_subscriptions']:,} Total</div>
-                <div class="metric-subvalue">Retention: {recurring_metrics['retention_rate']:.1f}%</div>
+                <div class="metric-value">{mrr_active_subscriptions:,}</div>
+                <div class="metric-label">Out of {mrr_total_subscriptions:,} Total</div>
+                <div class="metric-subvalue">Retention: {mrr_retention_rate:.1f}%</div>
             </div>
 
             <div class="metric-card">
@@ -922,17 +1219,19 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">⚠️</span>
                     <span>Churn Rate</span>
                 </div>
-                <div class="metric-value">{recurring_metrics['churn_rate']:.1f}%</div>
-                <div class="metric-label">Cancelled: {recurring_metrics['cancelled_subscriptions']:,}</div>
-                <div class="metric-subvalue">Avg Value: ₹{recurring_metrics['avg_subscription_value']:,.0f}</div>
+                <div class="metric-value">{mrr_churn_rate:.1f}%</div>
+                <div class="metric-label">Cancelled: {mrr_cancelled_subscriptions:,}</div>
+                <div class="metric-subvalue">Avg Value: ₹{mrr_avg_subscription_value:,.0f}</div>
             </div>
         </div>
 
         <div class="chart-container">
             {monthly_trend_html}
         </div>
+"""
 
-        <h2 class="section-header">
+# Premium campaign unique market section
+_PREMIUM_TEMPLATE = """        <h2 class="section-header">
             <span>🏢</span>
             Premium Campaign - Unique Market Analysis
         </h2>
@@ -943,11 +1242,11 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">📋</span>
                     <span>Lead Pool</span>
                 </div>
-                <div class="metric-value">{metrics['premium_campaign']['total_leads']:,}</div>
+                <div class="metric-value">{pc_total_leads:,}</div>
                 <div class="metric-label">Total Leads</div>
                 <div class="metric-subvalue">
-                    Quality: {metrics['premium_campaign']['quality']:.1f}% | 
-                    Conversion: {metrics['premium_campaign']['conversion_rate']:.1f}%
+                    Quality: {pc_quality:.1f}% | 
+                    Conversion: {pc_conversion_rate:.1f}%
                 </div>
             </div>
 
@@ -956,11 +1255,11 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">✅</span>
                     <span>Converted Customers</span>
                 </div>
-                <div class="metric-value">{premium_customers:,}</div>
-                <div class="metric-label">Subset of {metrics['all_time']['count']:,} All-Time ({metrics['premium_campaign']['percentage']:.1f}%)</div>
+                <div class="metric-value">{pc_customers:,}</div>
+                <div class="metric-label">Subset of {all_time_count:,} All-Time ({pc_percentage:.1f}%)</div>
                 <div class="metric-subvalue">
-                    Revenue: ₹{metrics['premium_campaign']['revenue']/1000:.1f}K | 
-                    Avg: ₹{metrics['premium_campaign']['avg_revenue']:,.0f}
+                    Revenue: ₹{pc_revenue_k:.1f}K | 
+                    Avg: ₹{pc_avg_revenue:,.0f}
                 </div>
             </div>
 
@@ -969,22 +1268,24 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">🔥</span>
                     <span>Warm Leads</span>
                 </div>
-                <div class="metric-value">{premium_pure_leads:,}</div>
+                <div class="metric-value">{pc_pure_leads:,}</div>
                 <div class="metric-label">Not Yet Converted</div>
                 <div class="metric-subvalue">
-                    Potential: ₹{premium_pure_leads * metrics['premium_campaign']['avg_revenue']/1000:.1f}K | 
-                    Recent: {recent_date_str}
+                    Potential: ₹{pc_potential_k:.1f}K | 
+                    Recent: {pc_recent_date_str}
                 </div>
             </div>
         </div>
 
         <div class="highlight-box">
             <h4>💡 Premium Campaign Unique Market Summary:</h4>
-            <p><strong>Total Unique Market: {premium_unique_market:,}</strong> ({premium_customers:,} converted + {premium_pure_leads:,} warm leads)</p>
-            <p style="margin-top: 10px;">Premium customers are already part of the {metrics['all_time']['count']:,} all-time enrollments.</p>
+            <p><strong>Total Unique Market: {pc_unique_market:,}</strong> ({pc_customers:,} converted + {pc_pure_leads:,} warm leads)</p>
+            <p style="margin-top: 10px;">Premium customers are already part of the {all_time_count:,} all-time enrollments.</p>
         </div>
+"""
 
-        <h2 class="section-header">
+# Team performance chart and table
+_TEAM_TEMPLATE = """        <h2 class="section-header">
             <span>👥</span>
             Team Performance Analysis
         </h2>
@@ -993,22 +1294,26 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
             {team_chart_html}
         </div>
         
-        {"<table class='team-table'><thead><tr><th>Team Member</th><th>Total Sales</th><th>Revenue</th><th>Conversion Rate</th><th>Revenue/Sale</th></tr></thead><tbody>" + "".join([f"<tr><td><strong>{name}</strong></td><td>{int(sales):,}</td><td>₹{revenue:,.0f}</td><td>{conv:.1f}%</td><td>₹{revenue/sales if sales > 0 else 0:,.0f}</td></tr>" for name, sales, revenue, conv in zip(team_names, team_sales, team_revenue, team_conversion)]) + "</tbody></table>" if team_names else "<p style='color: #888; padding: 20px;'>No team performance data available</p>"}
+        {team_table_html}
+"""
 
-        <h2 class="section-header">
+# Team enrollment attribution coverage and table
+_ENROLLMENTS_TEMPLATE = """        <h2 class="section-header">
             <span>🎓</span>
             Team Enrollment Attribution
         </h2>
         
         <div class="highlight-box" style="background: linear-gradient(135deg, #e3f2fd 0%, #f0f8ff 100%); border-left: 4px solid #2196f3;">
             <h4 style="color: #1565c0;">📊 Enrollment Mapping Coverage:</h4>
-            <p><strong>Mapped Enrollments: {metrics['team_enrollments']['total_mapped_enrollments']:,}</strong> ({metrics['team_enrollments']['mapping_coverage']:.1f}% of all enrollments)</p>
-            <p style="margin-top: 10px;">Unmapped: {metrics['team_enrollments']['total_unmapped_enrollments']:,} enrollments</p>
+            <p><strong>Mapped Enrollments: {te_total_mapped_enrollments:,}</strong> ({te_mapping_coverage:.1f}% of all enrollments)</p>
+            <p style="margin-top: 10px;">Unmapped: {te_total_unmapped_enrollments:,} enrollments</p>
         </div>
         
-        {"<table class='team-table'><thead><tr><th>Team Member</th><th>Enrollments</th><th>Total Revenue</th><th>Avg Revenue/Enrollment</th><th>% of Mapped Revenue</th></tr></thead><tbody>" + "".join([f"<tr><td><strong>{member}</strong></td><td>{int(count):,}</td><td>₹{revenue:,.0f}</td><td>₹{avg:,.0f}</td><td>{revenue/sum(team_enroll_revenue)*100:.1f}%</td></tr>" for member, count, revenue, avg in zip(team_enroll_members, team_enroll_count, team_enroll_revenue, team_enroll_avg)]) + "</tbody></table>" if team_enroll_members else "<p style='color: #888; padding: 20px;'>No enrollment attribution data available</p>"}
+        {enrollment_table_html}
+"""
 
-        <h2 class="section-header">
+# User activity and engagement cards
+_ACTIVITY_TEMPLATE = """        <h2 class="section-header">
             <span>📈</span>
             User Activity & Engagement
         </h2>
@@ -1019,9 +1324,9 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">🔥</span>
                     <span>Active (30d)</span>
                 </div>
-                <div class="metric-value">{activity_metrics.get('active_30d', 0):,}</div>
+                <div class="metric-value">{act_active_30d:,}</div>
                 <div class="metric-label">Recent Activity</div>
-                <div class="metric-subvalue">Engagement: {activity_metrics.get('engagement_rate', 0):.1f}%</div>
+                <div class="metric-subvalue">Engagement: {act_engagement_rate:.1f}%</div>
             </div>
 
             <div class="metric-card">
@@ -1029,9 +1334,9 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">⏰</span>
                     <span>Dormant (90d+)</span>
                 </div>
-                <div class="metric-value">{activity_metrics.get('dormant', 0):,}</div>
+                <div class="metric-value">{act_dormant:,}</div>
                 <div class="metric-label">Need Reactivation</div>
-                <div class="metric-subvalue">Churn Risk: {activity_metrics.get('churn_risk_30d', 0):,}</div>
+                <div class="metric-subvalue">Churn Risk: {act_churn_risk_30d:,}</div>
             </div>
 
             <div class="metric-card">
@@ -1039,13 +1344,15 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">📅</span>
                     <span>Most Recent</span>
                 </div>
-                <div class="metric-value" style="font-size: 1.5em;">{activity_metrics.get('most_recent_date', pd.NaT).strftime('%Y-%m-%d') if pd.notna(activity_metrics.get('most_recent_date')) else 'N/A'}</div>
+                <div class="metric-value" style="font-size: 1.5em;">{act_most_recent_date_str}</div>
                 <div class="metric-label">Latest Payment Date</div>
-                <div class="metric-subvalue">Avg Days Inactive: {activity_metrics.get('avg_days_inactive', 0):.0f}</div>
+                <div class="metric-subvalue">Avg Days Inactive: {act_avg_days_inactive:.0f}</div>
             </div>
         </div>
+"""
 
-        <h2 class="section-header">
+# Revenue overview cards
+_REVENUE_TEMPLATE = """        <h2 class="section-header">
             <span>💰</span>
             Revenue Overview
         </h2>
@@ -1056,11 +1363,11 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">💵</span>
                     <span>Total Revenue</span>
                 </div>
-                <div class="metric-value">₹{metrics['combined']['revenue']/1000000:.2f}M</div>
+                <div class="metric-value">₹{combined_revenue_m:.2f}M</div>
                 <div class="metric-label">Combined (All Sources)</div>
                 <div class="metric-subvalue">
-                    Lifetime: ₹{metrics['all_time']['revenue']/1000000:.2f}M | 
-                    Monthly: ₹{metrics['monthly']['revenue']/1000000:.2f}M
+                    Lifetime: ₹{all_time_revenue_m:.2f}M | 
+                    Monthly: ₹{monthly_revenue_m:.2f}M
                 </div>
             </div>
 
@@ -1069,9 +1376,9 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">📊</span>
                     <span>Revenue/Customer</span>
                 </div>
-                <div class="metric-value">₹{metrics['revenue_metrics']['revenue_per_customer']:,.0f}</div>
+                <div class="metric-value">₹{rev_revenue_per_customer:,.0f}</div>
                 <div class="metric-label">Average per Paying User</div>
-                <div class="metric-subvalue">ARR: ₹{metrics['revenue_metrics']['arr']/1000000:.2f}M</div>
+                <div class="metric-subvalue">ARR: ₹{rev_arr_m:.2f}M</div>
             </div>
 
             <div class="metric-card">
@@ -1079,145 +1386,240 @@ def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_met
                     <span class="metric-icon">👥</span>
                     <span>Total Users</span>
                 </div>
-                <div class="metric-value">{tam_paying:,}</div>
+                <div class="metric-value">{combined_paying_users:,}</div>
                 <div class="metric-label">Current Paying Users</div>
-                <div class="metric-subvalue">Active Recurring: {metrics['combined']['active_recurring']:,}</div>
+                <div class="metric-subvalue">Active Recurring: {combined_active_recurring:,}</div>
             </div>
         </div>
+"""
 
-        <footer>
-            <p><strong>Dashboard Generated:</strong> {datetime.now().strftime('%B %d, %Y at %I:%M %p IST')}</p>
+# Page footer with generation timestamp
+_FOOTER_TEMPLATE = """        <footer>
+            <p><strong>Dashboard Generated:</strong> {generated_at}</p>
             <p style="margin-top: 10px;">🚀 NovaSignals Growth Analytics</p>
             <div class="creator-badge">Created by Aryan Agarwal</div>
         </footer>
-    </div>
-</body>
-</html>"""
+"""
+
+# Dashboard sections in page order, separated by a blank line
+_SECTION_TEMPLATES = (
+    _TAM_TEMPLATE,
+    _FUNNEL_TEMPLATE,
+    _MRR_TEMPLATE,
+    _PREMIUM_TEMPLATE,
+    _TEAM_TEMPLATE,
+    _ENROLLMENTS_TEMPLATE,
+    _ACTIVITY_TEMPLATE,
+    _REVENUE_TEMPLATE,
+)
+
+# Rendered sections from the last dashboard, keyed by _content_key (header and
+# footer carry the generation time and are always rendered fresh)
+_SECTIONS_MEMO = {}
+
+def _content_key(source_key, ctx):
+    """Workbook fingerprint plus every scalar metric, identifying what the sections show"""
+    scalars = tuple((key, value) for key, value in ctx.items()
+                    if key != 'generated_at' and isinstance(value, (int, float, str, np.generic, pd.Timestamp, type(pd.NaT))))
+    return source_key, scalars
+
+# Table markup; each row template formats one itertuples() row
+_TEAM_TABLE_HEAD = ("<table class='team-table'><thead><tr><th>Team Member</th><th>Total Sales</th><th>Revenue</th>"
+                    "<th>Conversion Rate</th><th>Revenue/Sale</th></tr></thead><tbody>")
+_TEAM_ROW = "<tr><td><strong>{}</strong></td><td>{:,.0f}</td><td>₹{:,.0f}</td><td>{:.1f}%</td><td>₹{:,.0f}</td></tr>"
+
+_ENROLLMENT_TABLE_HEAD = ("<table class='team-table'><thead><tr><th>Team Member</th><th>Enrollments</th><th>Total Revenue</th>"
+                          "<th>Avg Revenue/Enrollment</th><th>% of Mapped Revenue</th></tr></thead><tbody>")
+_ENROLLMENT_ROW = "<tr><td><strong>{}</strong></td><td>{:,.0f}</td><td>₹{:,.0f}</td><td>₹{:,.0f}</td><td>{:.1f}%</td></tr>"
+
+_TABLE_CLOSE = "</tbody></table>"
+
+def _html_rows(row_template, frame):
+    """Format every row of frame (columns in template order) and join them"""
+    return "".join(starmap(row_template.format, frame.itertuples(index=False, name=None)))
+
+def _render_team_table(team_data):
+    """Render team performance table, one row per team member"""
+    if team_data.empty:
+        return "<p style='color: #888; padding: 20px;'>No team performance data available</p>"
+    
+    sales = team_data['Total Sales']
+    rows = pd.DataFrame({
+        'name': team_data['Alloted to'].astype(str).map(escape),
+        'sales': sales,
+        'revenue': team_data['Revenue'],
+        'conversion': team_data['conversion_rate'],
+        'revenue_per_sale': team_data['Revenue'].div(sales.where(sales > 0)).fillna(0),
+    })
+    return _TEAM_TABLE_HEAD + _html_rows(_TEAM_ROW, rows) + _TABLE_CLOSE
+
+def _render_enrollment_table(team_enroll_data):
+    """Render team enrollment attribution table, one row per team member"""
+    if team_enroll_data.empty:
+        return "<p style='color: #888; padding: 20px;'>No enrollment attribution data available</p>"
+    
+    revenue = team_enroll_data['Total_Revenue']
+    total_revenue = revenue.sum() or 1  # avoid 0/0 when nothing mapped earned revenue
+    rows = pd.DataFrame({
+        'name': team_enroll_data['Team_Member'].astype(str).map(escape),
+        'count': team_enroll_data['Enrollment_Count'],
+        'revenue': revenue,
+        'avg_revenue': team_enroll_data['Avg_Revenue'],
+        'share': revenue / total_revenue * 100,
+    })
+    return _ENROLLMENT_TABLE_HEAD + _html_rows(_ENROLLMENT_ROW, rows) + _TABLE_CLOSE
+
+def create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_metrics, out, source_key=None):
+    """Write comprehensive HTML dashboard with charts to the file-like out; source_key (the
+    workbook fingerprint from load_all_data) lets a repeat call reuse the rendered sections"""
+    
+    ctx = _flatten_metrics(metrics, activity_metrics, team_metrics, recurring_metrics)
+    
+    out.write(_HEAD)
+    out.write(_CSS)
+    out.write(_BODY_OPEN)
+    out.write(_HEADER_TEMPLATE.format_map(ctx))
+    out.write("\n")
+    
+    # Same workbook and same numbers: reuse the charts and sections rendered last time
+    key = _content_key(source_key, ctx) if source_key else None
+    sections = _SECTIONS_MEMO.get(key) if key else None
+    if sections is None:
+        ctx.update({
+            'funnel_chart_html': create_funnel_chart(metrics),
+            'monthly_trend_html': create_monthly_trend_chart(recurring_metrics),
+            'team_chart_html': create_team_performance_chart(team_metrics),
+            'team_table_html': _render_team_table(ctx['team_team_stats']),
+            'enrollment_table_html': _render_enrollment_table(ctx['te_team_enrollment_stats']),
+        })
+        # Write each section as soon as it is rendered, keeping them only for the memo
+        rendered = []
+        for template in _SECTION_TEMPLATES:
+            section = template.format_map(ctx)
+            out.write(section)
+            out.write("\n")
+            if key:
+                rendered.append(section)
+        if key:
+            _SECTIONS_MEMO.clear()
+            _SECTIONS_MEMO[key] = tuple(rendered)
+    else:
+        for section in sections:
+            out.write(section)
+            out.write("\n")
     
-    return html_content
+    out.write(_FOOTER_TEMPLATE.format_map(ctx))
+    out.write(_PAGE_CLOSE)
 
 # ============================================================================
 # 9. GENERATE TEXT REPORT
 # ============================================================================
 
+_BAR = '=' * 80
+
+def _report_heading(title):
+    """Lines for a barred report heading, with a blank line either side"""
+    return ["", _BAR, title, _BAR, ""]
+
 def create_text_report(metrics, activity_metrics, team_metrics, recurring_metrics):
     """Generate comprehensive text report"""
     
-    tam_paying = metrics['combined']['paying_users']
-    tam_leads = metrics['premium_campaign']['pure_leads']
-    tam_total = metrics['revenue_metrics']['total_addressable_market']
+    ctx = _flatten_metrics(metrics, activity_metrics, team_metrics, recurring_metrics)
+    
+    lines = _report_heading("NOVASIGNALS GROWTH DASHBOARD - COMPREHENSIVE REPORT")
+    lines += [
+        f"Generated: {ctx['generated_at']}",
+        "Created by: Aryan Agarwal",
+    ]
+    
+    lines += _report_heading("TOTAL ADDRESSABLE MARKET (TAM) - CORRECTED")
+    lines += [
+        f"Current Paying Users:           {ctx['combined_paying_users']:,}",
+        f"+ Pure Leads (Not Converted):   {ctx['pc_pure_leads']:,}",
+        f"= Total Addressable Market:     {ctx['rev_total_addressable_market']:,}",
+    ]
+    
+    lines += _report_heading("SALES FUNNEL PERFORMANCE")
+    lines += [
+        f"Peak Attendance:                {ctx['funnel_peak']:,}",
+        f"Pitch Attendance:               {ctx['funnel_pitch']:,}",
+        f"Show-up Rate:                   {ctx['funnel_show_up_rate']:.1f}%",
+        f"Total Sales:                    {ctx['funnel_sales']:,}",
+        f"Conversion Rate:                {ctx['funnel_conversion_rate']:.1f}%",
+        f"Funnel Revenue:                 ₹{ctx['funnel_revenue']:,.2f}",
+    ]
+    
+    lines += _report_heading("MONTHLY RECURRING REVENUE")
+    lines += [
+        f"Total Subscriptions:            {ctx['mrr_total_subscriptions']:,}",
+        f"Active Subscriptions:           {ctx['mrr_active_subscriptions']:,}",
+        f"Cancelled Subscriptions:        {ctx['mrr_cancelled_subscriptions']:,}",
+        f"Active MRR:                     ₹{ctx['mrr_active_mrr']:,.2f}",
+        f"Annual Run Rate (ARR):          ₹{ctx['mrr_active_arr']:,.2f}",
+        f"Avg Subscription Value:         ₹{ctx['mrr_avg_subscription_value']:,.2f}",
+        f"Churn Rate:                     {ctx['mrr_churn_rate']:.1f}%",
+        f"Retention Rate:                 {ctx['mrr_retention_rate']:.1f}%",
+    ]
     
-    premium_customers = metrics['premium_campaign']['customers']
-    premium_pure_leads = metrics['premium_campaign']['pure_leads']
-    premium_unique_market = metrics['premium_campaign']['unique_market']
+    lines += _report_heading("PREMIUM CAMPAIGN - UNIQUE MARKET ANALYSIS")
+    lines += [
+        f"Total Leads:                    {ctx['pc_total_leads']:,}",
+        f"Converted Customers:            {ctx['pc_customers']:,}",
+        f"Pure Leads (Not Converted):     {ctx['pc_pure_leads']:,}",
+        f"Conversion Rate:                {ctx['pc_conversion_rate']:.1f}%",
+        f"Total Revenue:                  ₹{ctx['pc_revenue']:,.2f}",
+    ]
     
-    team_summary = ""
-    if 'team_stats' in team_metrics and team_metrics['team_stats'] is not None:
-        team_df = team_metrics['team_stats']
-        team_summary = "\nTOP PERFORMERS:\n"
-        for idx, row in team_df.head(5).iterrows():
-            team_summary += f"  {row['Alloted to']:15} | Sales: {int(row['Total Sales']):4} | Revenue: ₹{row['Revenue']:,.0f} | Conv: {row['conversion_rate']:.1f}%\n"
+    lines += _report_heading("TEAM PERFORMANCE")
+    lines += [
+        f"Total Team Members:             {ctx['team_total_team_members']}",
+        f"Top Performer:                  {ctx['team_top_performer']}",
+    ]
+    if not ctx['team_team_stats'].empty:
+        top_team = ctx['team_team_stats'].head(5)[['Alloted to', 'Total Sales', 'Revenue', 'conversion_rate']]
+        lines += ["", "TOP PERFORMERS:"]
+        lines += [
+            f"  {name:15} | Sales: {int(sales):4} | Revenue: ₹{revenue:,.0f} | Conv: {conv:.1f}%"
+            for name, sales, revenue, conv in top_team.itertuples(index=False, name=None)
+        ]
+        lines.append("")
     else:
-        team_summary = "  No team performance data available"
-    
-    team_enroll_summary = ""
-    if 'team_enrollment_stats' in metrics['team_enrollments'] and metrics['team_enrollments']['team_enrollment_stats'] is not None:
-        team_enroll_df = metrics['team_enrollments']['team_enrollment_stats']
-        team_enroll_summary = "\nTOP ENROLLMENT CONTRIBUTORS:\n"
-        for idx, row in team_enroll_df.head(10).iterrows():
-            team_enroll_summary += f"  {row['Team_Member']:15} | Enrollments: {int(row['Enrollment_Count']):4} | Revenue: ₹{row['Total_Revenue']:,.0f}\n"
+        lines.append("  No team performance data available")
+    
+    lines += _report_heading("TEAM ENROLLMENT ATTRIBUTION")
+    lines += [
+        f"Mapped Enrollments:             {ctx['te_total_mapped_enrollments']:,}",
+        f"Mapping Coverage:               {ctx['te_mapping_coverage']:.1f}%",
+    ]
+    if not ctx['te_team_enrollment_stats'].empty:
+        top_enroll = ctx['te_team_enrollment_stats'].head(10)[['Team_Member', 'Enrollment_Count', 'Total_Revenue']]
+        lines += ["", "TOP ENROLLMENT CONTRIBUTORS:"]
+        lines += [
+            f"  {member:15} | Enrollments: {int(count):4} | Revenue: ₹{revenue:,.0f}"
+            for member, count, revenue in top_enroll.itertuples(index=False, name=None)
+        ]
+        lines.append("")
     else:
-        team_enroll_summary = "  No enrollment attribution data available"
+        lines.append("  No enrollment attribution data available")
     
-    report = f"""
-{'='*80}
-NOVASIGNALS GROWTH DASHBOARD - COMPREHENSIVE REPORT
-{'='*80}
-
-Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p IST')}
-Created by: Aryan Agarwal
-
-{'='*80}
-TOTAL ADDRESSABLE MARKET (TAM) - CORRECTED
-{'='*80}
-
-Current Paying Users:           {tam_paying:,}
-+ Pure Leads (Not Converted):   {tam_leads:,}
-= Total Addressable Market:     {tam_total:,}
-
-{'='*80}
-SALES FUNNEL PERFORMANCE
-{'='*80}
-
-Peak Attendance:                {metrics['funnel']['peak']:,}
-Pitch Attendance:               {metrics['funnel']['pitch']:,}
-Show-up Rate:                   {metrics['funnel']['show_up_rate']:.1f}%
-Total Sales:                    {metrics['funnel']['sales']:,}
-Conversion Rate:                {metrics['funnel']['conversion_rate']:.1f}%
-Funnel Revenue:                 ₹{metrics['funnel']['revenue']:,.2f}
-
-{'='*80}
-MONTHLY RECURRING REVENUE
-{'='*80}
-
-Total Subscriptions:            {recurring_metrics['total_subscriptions']:,}
-Active Subscriptions:           {recurring_metrics['active_subscriptions']:,}
-Cancelled Subscriptions:        {recurring_metrics['cancelled_subscriptions']:,}
-Active MRR:                     ₹{recurring_metrics['active_mrr']:,.2f}
-Annual Run Rate (ARR):          ₹{recurring_metrics['active_mrr']*12:,.2f}
-Avg Subscription Value:         ₹{recurring_metrics['avg_subscription_value']:,.2f}
-Churn Rate:                     {recurring_metrics['churn_rate']:.1f}%
-Retention Rate:                 {recurring_metrics['retention_rate']:.1f}%
-
-{'='*80}
-PREMIUM CAMPAIGN - UNIQUE MARKET ANALYSIS
-{'='*80}
-
-Total Leads:                    {metrics['premium_campaign']['total_leads']:,}
-Converted Customers:            {premium_customers:,}
-Pure Leads (Not Converted):     {premium_pure_leads:,}
-Conversion Rate:                {metrics['premium_campaign']['conversion_rate']:.1f}%
-Total Revenue:                  ₹{metrics['premium_campaign']['revenue']:,.2f}
-
-{'='*80}
-TEAM PERFORMANCE
-{'='*80}
-
-Total Team Members:             {team_metrics.get('total_team_members', 0)}
-Top Performer:                  {team_metrics.get('top_performer', 'N/A')}
-{team_summary}
-
-{'='*80}
-TEAM ENROLLMENT ATTRIBUTION
-{'='*80}
-
-Mapped Enrollments:             {metrics['team_enrollments']['total_mapped_enrollments']:,}
-Mapping Coverage:               {metrics['team_enrollments']['mapping_coverage']:.1f}%
-{team_enroll_summary}
-
-{'='*80}
-USER ACTIVITY & ENGAGEMENT
-{'='*80}
-
-Active (30d):                   {activity_metrics.get('active_30d', 0):,}
-Dormant (90d+):                 {activity_metrics.get('dormant', 0):,}
-Engagement Rate:                {activity_metrics.get('engagement_rate', 0):.1f}%
-
-{'='*80}
-REVENUE SUMMARY
-{'='*80}
-
-Total Revenue:                  ₹{metrics['combined']['revenue']:,.2f}
-Revenue per Customer:           ₹{metrics['revenue_metrics']['revenue_per_customer']:,.2f}
-ARR:                            ₹{metrics['revenue_metrics']['arr']:,.2f}
-MRR:                            ₹{metrics['revenue_metrics']['mrr']:,.2f}
-
-{'='*80}
-Created by: Aryan Agarwal
-{'='*80}
-"""
+    lines += _report_heading("USER ACTIVITY & ENGAGEMENT")
+    lines += [
+        f"Active (30d):                   {ctx['act_active_30d']:,}",
+        f"Dormant (90d+):                 {ctx['act_dormant']:,}",
+        f"Engagement Rate:                {ctx['act_engagement_rate']:.1f}%",
+    ]
     
-    return report
+    lines += _report_heading("REVENUE SUMMARY")
+    lines += [
+        f"Total Revenue:                  ₹{ctx['combined_revenue']:,.2f}",
+        f"Revenue per Customer:           ₹{ctx['rev_revenue_per_customer']:,.2f}",
+        f"ARR:                            ₹{ctx['rev_arr']:,.2f}",
+        f"MRR:                            ₹{ctx['rev_mrr']:,.2f}",
+    ]
+    
+    lines += _report_heading("Created by: Aryan Agarwal")
+    
+    return "\n".join(lines)
 
 # ============================================================================
 # 10. MAIN EXECUTION
@@ -1234,7 +1636,7 @@ def main():
     
     try:
         # Load all data
-        df_coc, df_payments, df_monthly, df_podcast, df_premium = load_all_data()
+        df_coc, df_payments, df_monthly, df_podcast, df_premium, source_key = load_all_data()
         
         # Calculate monthly recurring metrics
         recurring_metrics = calculate_monthly_recurring_metrics(df_monthly)
@@ -1253,10 +1655,18 @@ def main():
         
         # Generate HTML dashboard
         print("\n📝 Generating dashboard with charts...")
-        html_content = create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_metrics)
-        
-        with open(OUTPUT_HTML, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        # Stream into a temp file (64 KiB buffer batches the section writes) and swap it in
+        # only once rendering succeeds, so a failure never truncates the previous dashboard
+        tmp_html = OUTPUT_HTML + '.tmp'
+        # Opened outside the try: if the open itself fails there is no temp file to clean up
+        f = open(tmp_html, 'w', encoding='utf-8', buffering=1 << 16)
+        try:
+            with f:
+                create_html_dashboard(metrics, activity_metrics, team_metrics, recurring_metrics, f, source_key)
+        except Exception:
+            os.remove(tmp_html)
+            raise
+        os.replace(tmp_html, OUTPUT_HTML)
         
         print(f"✅ Dashboard saved: {OUTPUT_HTML}")
         
@@ -1277,7 +1687,7 @@ def main():
         print(f"  • Premium Market: {metrics['premium_campaign']['unique_market']:,}")
         print(f"  • Active MRR: ₹{recurring_metrics['active_mrr']:,.0f}")
         print(f"  • Funnel Conversion: {metrics['funnel']['conversion_rate']:.1f}%")
-        print(f"  • Team Members: {team_metrics.get('total_team_members', 0)}")
+        print(f"  • Team Members: {team_metrics['total_team_members']}")
         print(f"  • Active Users (30d): {activity_metrics.get('active_30d', 0):,}")
         
         print(f"\n🚀 Next: Open {OUTPUT_HTML} in your browser")